@@ -3,7 +3,8 @@
 import sys
 import subprocess
 import argparse
-from typing import List, Dict, Optional
+import bisect
+from typing import Callable, List, Dict, Optional, Tuple
 import os
 import hashlib
 import pickle
@@ -11,17 +12,38 @@ import time
 from pathlib import Path
 import math
 import yaml
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import partial
 
-from utils import CACHE_FILE, JOURNAL_DIR, hash_journal_dir, load_cache, save_cache, run_hledger_command, parse_hledger_output, load_tax_params, load_hledger_aliases, load_business_expenses, load_home_office_info, load_filing_status, load_additional_federal_deduction
+from utils import CACHE_FILE, hash_journal_dir, enable_quick_journal_check, load_cache, save_cache, run_hledger_command, run_hledger_balances, parse_hledger_output, load_tax_params, load_hledger_aliases, load_business_expenses, load_home_office_info, load_filing_status, load_additional_federal_deduction, load_personal_params
 
+# Number of hledger processes to run concurrently; queries are independent and subprocess-bound
+HLEDGER_WORKERS = 8
 
-def compute_interest(year: int) -> float:
+
+@dataclass(frozen=True)
+class TaxConfig:
+    """
+    Configuration for a single tax year, loaded once per compute_taxes call.
+    fed_params and ca_params are already resolved for the filing status.
+    medicare_fed_params is the federal parameter set used for the Medicare threshold, which
+    defaults to the 'single' status (rather than 'joint') when personal.yaml sets no filing_status.
+    """
+    filing_status: str
+    fed_params: dict
+    ca_params: dict
+    medicare_fed_params: dict
+    home_office: dict
+    additional_deduction: float
+    personal: dict
+
+
+def compute_interest(year: int, cfg: TaxConfig) -> float:
     """
     Compute the total mortgage interest paid for the given year, using either per-year override, hledger account, or amortization formula as specified in personal.yaml. If no option is provided, return 0.0.
     """
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
+    params = cfg.personal
     # Option 1: Per-year override
     if "interest_by_year" in params and str(year) in params["interest_by_year"]:
         return params["interest_by_year"][str(year)]
@@ -39,8 +61,9 @@ def compute_interest(year: int) -> float:
         def balance_after(m):
             if monthly_rate == 0:
                 return principal - payment * m
-            factor = pow(1 + monthly_rate, m)
-            return principal * factor - payment * (factor - 1) / monthly_rate
+            # growth = (1 + monthly_rate)^m - 1, computed without cancellation for small rates
+            growth = math.expm1(m * math.log1p(monthly_rate))
+            return principal * (1 + growth) - payment * growth / monthly_rate
         def interest_paid_until(m):
             total_paid = payment * m
             remaining_balance = balance_after(m)
@@ -61,24 +84,12 @@ def compute_self_employment_tax(net_business_income: float) -> float:
     return net_business_income * 0.9235 * 0.029
 
 
-def compute_investment_tax(investment_income: float, agi: float, year: int) -> float:
+def compute_investment_tax(investment_income: float, agi: float, fed_params: dict) -> float:
     """
     Compute Net Investment Income Tax (NIIT) for the given investment income.
     NIIT is only charged if AGI exceeds the threshold.
     Returns the investment tax amount.
     """
-    # Load filing status from personal.yaml
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
-    filing_status = params.get("filing_status", "joint")
-    
-    # Load federal tax parameters to get NIIT threshold
-    fed_params = load_tax_params(year)['federal'].get(filing_status)
-    if fed_params is None:
-        fed_params = load_tax_params(year)['federal'].get('joint')
-    if fed_params is None:
-        raise ValueError(f"No federal tax parameters found for filing status '{filing_status}' or 'joint'.")
-    
     niit_threshold = fed_params.get('niit_threshold', 200000)  # Default to $200,000
     
     # NIIT is only charged if AGI exceeds the threshold
@@ -92,16 +103,13 @@ def compute_investment_tax(investment_income: float, agi: float, year: int) -> f
     return 0.038 * max(taxable_amount, 0)
 
 
-def compute_solo_401k_contribution(net_business_income: float, year: int) -> float:
+def compute_solo_401k_contribution(net_business_income: float, cfg: TaxConfig) -> float:
     """
     Compute solo 401(k) contribution based on configuration in personal.yaml.
     Returns the contribution amount.
     """
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
-    
     # Get contribution configuration, default to maximize
-    contribution_config = params.get("solo_401k_contribution", "maximize")
+    contribution_config = cfg.personal.get("solo_401k_contribution", "maximize")
     
     # Calculate maximum allowed contribution (19.732% of net business income)
     max_contribution = net_business_income * 0.19732
@@ -119,16 +127,11 @@ def compute_solo_401k_contribution(net_business_income: float, year: int) -> flo
         return max_contribution
 
 
-def compute_social_security_tax(w2_medicare: float, net_business_income: float, ss_max: float, soc_tax_paid: float, year: int) -> float:
+def compute_social_security_tax(w2_medicare: float, net_business_income: float, ss_max: float, soc_tax_paid: float, cfg: TaxConfig) -> float:
     """
     Compute additional Social Security tax beyond the standard withholding.
     Returns the extra SS tax amount.
     """
-    # Load filing status from personal.yaml
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
-    filing_status = params.get("filing_status", "joint")
-    
     # Social Security tax is 12.4% (6.2% employee + 6.2% employer) on wages up to ss_max
     # For self-employed, it's the full 12.4% on self-employment income up to ss_max
     
@@ -137,7 +140,7 @@ def compute_social_security_tax(w2_medicare: float, net_business_income: float,
     # For joint filing, multiply ss_max by 2 (both spouses can contribute up to ss_max)
 
     # assumes that both spouses are over the limit
-    if filing_status == "joint":
+    if cfg.filing_status == "joint":
         ss_max = ss_max * 2
     w2_ss_tax = min(w2_medicare * 0.124, ss_max)
     # Self-employment income: 12.4% on 92.35% of net business income up to ss_max
@@ -152,23 +155,11 @@ def compute_social_security_tax(w2_medicare: float, net_business_income: float,
     return -ss_extra
 
 
-def compute_medicare_tax(w2_medicare: float, net_business_income: float, med_tax_paid: float, year: int) -> float:
+def compute_medicare_tax(w2_medicare: float, net_business_income: float, med_tax_paid: float, fed_params: dict) -> float:
     """
     Compute additional Medicare tax beyond the standard withholding.
     Returns the extra Medicare tax amount.
     """
-    # Load filing status from personal.yaml
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
-    filing_status = params.get("filing_status", "single")
-    
-    # Load federal tax parameters to get Medicare threshold
-    fed_params = load_tax_params(year)['federal'].get(filing_status)
-    if fed_params is None:
-        fed_params = load_tax_params(year)['federal'].get('joint')
-    if fed_params is None:
-        raise ValueError(f"No federal tax parameters found for filing status '{filing_status}' or 'joint'.")
-    
     threshold = fed_params.get('medicare_threshold', 200000)  # Default to $200,000
 
     medicare_tax = 0.0145 * w2_medicare  # medicare on self-employment income in self_employment_tax
@@ -182,118 +173,201 @@ def compute_medicare_tax(w2_medicare: float, net_business_income: float, med_tax
     return max(total - med_tax_paid, 0.0)
 
 
-def compute_bracket_tax(taxable_income: float, brackets: list) -> float:
+def bracket_schedule(brackets: list) -> Tuple[tuple, tuple, tuple]:
+    """
+    Precompute (thresholds, rates, base_tax) for a list of brackets sorted ascending by threshold.
+    base_tax[i] is the tax owed on income up to thresholds[i].
+    """
+    thresholds = tuple(bracket['threshold'] for bracket in brackets)
+    rates = tuple(bracket['rate'] for bracket in brackets)
+    base_tax = [0.0]
+    for i in range(1, len(brackets)):
+        base_tax.append(base_tax[-1] + (thresholds[i] - thresholds[i-1]) * rates[i-1])
+    return thresholds, rates, tuple(base_tax)
+
+
+def compute_bracket_tax(taxable_income: float, schedule: Tuple[tuple, tuple, tuple]) -> float:
     """
-    Compute tax owed given a list of tax brackets and taxable income.
-    Brackets should be a list of dicts with 'threshold' and 'rate', sorted ascending.
+    Compute tax owed given a bracket schedule from bracket_schedule and taxable income.
     """
-    tax = 0.0
-    prev_threshold = 0.0
-    for i, bracket in enumerate(brackets):
-        threshold = bracket['threshold']
-        rate = bracket['rate']
-        # For the last bracket, apply rate to all remaining income
-        if i + 1 == len(brackets):
-            tax += (taxable_income - threshold) * rate if taxable_income > threshold else 0
+    thresholds, rates, base_tax = schedule
+    i = bisect.bisect_right(thresholds, taxable_income) - 1
+    if i < 0:
+        return 0.0
+    return max(base_tax[i] + (taxable_income - thresholds[i]) * rates[i], 0.0)
+
+
+def surcharge_schedule(surcharges: list) -> Tuple[tuple, tuple]:
+    """
+    Precompute (thresholds, rates) for a list of surcharges, each a dict with 'threshold' and 'rate'.
+    """
+    surcharges = surcharges or []
+    return (tuple(s.get('threshold', 0) for s in surcharges),
+            tuple(s.get('rate', 0) for s in surcharges))
+
+
+def compute_surcharges(taxable_income: float, surcharges: Tuple[tuple, tuple]) -> float:
+    """
+    Compute the surcharges owed on taxable income, given a schedule from surcharge_schedule.
+    Each surcharge applies its rate to the income above its threshold.
+    """
+    total = 0.0
+    for threshold, rate in zip(*surcharges):
+        total += rate * max(taxable_income - threshold, 0.0)
+    return total
+
+
+def compute_schedule_tax(taxable_income: float, schedule: Tuple[tuple, tuple, tuple], surcharges: Tuple[tuple, tuple]) -> float:
+    """
+    Compute bracket tax plus surcharges for a jurisdiction in a single call.
+    """
+    return compute_bracket_tax(taxable_income, schedule) + compute_surcharges(taxable_income, surcharges)
+
+def load_tax_config(year: int) -> TaxConfig:
+    """
+    Load the personal configuration and the federal and CA parameters for the year's filing status.
+    """
+    personal = load_personal_params()
+    filing_status = personal.get("filing_status", "joint")
+    # Federal and CA params already resolved for the selected status
+    params = load_tax_params(year, filing_status)
+    # The Medicare threshold has always defaulted to 'single' when no filing status is configured
+    medicare_status = personal.get("filing_status", "single")
+    return TaxConfig(
+        filing_status=filing_status,
+        fed_params=params['federal'],
+        ca_params=params['ca'],
+        medicare_fed_params=load_tax_params(year, medicare_status)['federal'],
+        home_office=personal.get("home_office", {}),
+        additional_deduction=personal.get("additional_federal_deduction", 0.0),
+        personal=personal,
+    )
+
+
+def build_accounts(q: dict, groups: dict) -> List[str]:
+    """
+    Build the hledger arguments for one query from aliases.yaml: its accounts, the accounts of each
+    group in remove_groups, and an --alias for each exclude_account.
+    """
+    result = []
+    # Add all items in accounts (as strings)
+    for acct in q.get("accounts", []):
+        # If acct is a dict (from YAML unquoted key), convert to string
+        if isinstance(acct, dict):
+            for k, v in acct.items():
+                if v is None:
+                    result.append(str(k) + ':')
+                else:
+                    result.append(str(k) + ':' + str(v))
         else:
-            next_threshold = brackets[i+1]['threshold']
-            if taxable_income > threshold:
-                taxed_amount = min(taxable_income, next_threshold) - threshold
-                tax += taxed_amount * rate
-    return max(tax, 0.0)
+            result.append(str(acct))
+    # Add all items from each group in remove_groups
+    for group in q.get("remove_groups", []):
+        for acct in groups.get(group, []):
+            result.append(f"{str(acct)}")
+    # Add --alias <alias>=xyz for each exclude_account
+    for alias in q.get("exclude_accounts", []):
+        result.append("--alias")
+        result.append(f"{alias}=xyz")
+    return result
 
-def compute_taxes(year: int):
+
+def resolve_queries(aliases: dict) -> Dict[str, List[str]]:
     """
-    Compute and print the tax summary for the given year.
+    Resolve every query in aliases.yaml to its hledger arguments once, so per-year lookups are plain dict reads.
     """
-    params = load_tax_params(year)
-    filing_status = load_filing_status()
-    # Federal and CA params for the selected status
-    fed_params = params['federal'].get(filing_status)
-    if fed_params is None:
-        fed_params = params['federal'].get('joint')
-    if fed_params is None:
-        raise ValueError(f"No federal tax parameters found for filing status '{filing_status}' or 'joint'.")
-    ca_params = params['ca'].get(filing_status)
-    if ca_params is None:
-        ca_params = params['ca'].get('joint')
-    if ca_params is None:
-        raise ValueError(f"No CA tax parameters found for filing status '{filing_status}' or 'joint'.")
-    fed_brackets = fed_params['brackets']
-    fed_sd = fed_params['standard_deduction']
-    ss_max = fed_params['ss_max']
-    ca_brackets = ca_params['brackets']
-    ca_sd = ca_params['standard_deduction']
-    ca_surcharges = ca_params.get('surcharges', [])
-    fed_surcharges = fed_params.get('surcharges', [])
+    groups = {k: v for k, v in aliases.items() if k not in ["queries"]}
+    return {key: build_accounts(q, groups) for key, q in aliases["queries"].items()}
 
-    INTEREST = compute_interest(year)
-    additional_deduction = load_additional_federal_deduction()
 
+def hledger_tasks(year: int, cfg: TaxConfig, aliases: dict, resolved_queries: Dict[str, List[str]]) -> Dict[str, Callable[[], float]]:
+    """
+    Build the independent hledger lookups needed for the year, keyed by input name.
+    Each task is a zero-argument callable so the caller decides how to run them.
+    """
     # business_expenses = load_business_expenses()  # Removed - using aliases.yaml instead
-    home_office = load_home_office_info()
-    # Hledger queries (unchanged aliases and accounts)
-    aliases = load_hledger_aliases()
-    groups = {k: v for k, v in aliases.items() if k not in ["queries"]}
+    home_office = cfg.home_office
     queries = aliases["queries"]
-    def build_accounts(q):
-        result = []
-        # Add all items in accounts (as strings)
-        for acct in q.get("accounts", []):
-            # If acct is a dict (from YAML unquoted key), convert to string
-            if isinstance(acct, dict):
-                for k, v in acct.items():
-                    if v is None:
-                        result.append(str(k) + ':')
-                    else:
-                        result.append(str(k) + ':' + str(v))
-            else:
-                result.append(str(acct))
-        act = str(result)
-        # Add all items from each group in remove_groups
-        for group in q.get("remove_groups", []):
-            for acct in groups.get(group, []):
-                result.append(f"{str(acct)}")
-        # Add --alias <alias>=xyz for each exclude_account
-        for alias in q.get("exclude_accounts", []):
-            result.append("--alias")
-            result.append(f"{alias}=xyz")
-        return result
     def hledger_query(query_key):
-        q = queries.get(query_key, {})
-        accounts = build_accounts(q)
-        return run_hledger_command(accounts, year=year)
+        return partial(run_hledger_command, resolved_queries.get(query_key, []), year)
     def hledger_query_no_year(query_key):
-        q = queries.get(query_key, {})
-        accounts = build_accounts(q)
-        accounts = [f"{acct}:{year}" for acct in accounts]  # <-- append year to each account
-        return run_hledger_command(accounts)
-    w2 = hledger_query("w2")
-    w2_medicare = hledger_query("w2_medicare")
-    w2_ca = hledger_query("w2_ca")
-    total_inc = hledger_query("total_inc")
-    dividend_longterm = hledger_query("dividend_longterm")
-    dividend_shortterm = hledger_query("dividend_shortterm")
-    dividend_shortterm_state = hledger_query("dividend_shortterm_state")
-    dividend_qualified = hledger_query("dividend_qualified")
-    capital_gain_longterm = hledger_query("capital_gain_longterm")
-    capital_gain_shortterm = hledger_query("capital_gain_shortterm")
-    loss = hledger_query("loss")
-    interest = hledger_query("interest")
-    interest_state = hledger_query("interest_state")
-    fed_tax_paid = hledger_query_no_year("fed_tax_paid")
-    soc_tax_paid = hledger_query_no_year("soc_tax_paid")
-    med_tax_paid = hledger_query_no_year("med_tax_paid")
-    state_tax_paid = hledger_query_no_year("state_tax_paid")
-    # Calculate home office expenses using accounts from personal.yaml
-    home_office_expenses = 0.0
-    for acct in home_office.get("accounts", []):
-        home_office_expenses += run_hledger_command([acct], year=year)
-    
-    business_expenses = 0.0
-    for acct in queries.get("business_expenses", {}).get("accounts", []):
-        business_expenses += run_hledger_command([acct], year=year)
-    foreign_credit = hledger_query("foreign_credit")
+        accounts = [f"{acct}:{year}" for acct in resolved_queries.get(query_key, [])]  # <-- append year to each account
+        return partial(run_hledger_command, accounts)
+    # Collect every hledger query up front so they can run concurrently
+    tasks = {key: hledger_query(key) for key in [
+        "w2", "w2_medicare", "w2_ca", "total_inc",
+        "dividend_longterm", "dividend_shortterm", "dividend_shortterm_state", "dividend_qualified",
+        "capital_gain_longterm", "capital_gain_shortterm", "loss", "interest", "interest_state",
+        "foreign_credit",
+    ]}
+    for key in ["fed_tax_paid", "soc_tax_paid", "med_tax_paid", "state_tax_paid"]:
+        tasks[key] = hledger_query_no_year(key)
+    # Home office expenses use accounts from personal.yaml
+    home_office_accounts = home_office.get("accounts", [])
+    business_accounts = queries.get("business_expenses", {}).get("accounts", [])
+    tasks["home_office_expenses"] = partial(run_hledger_balances, home_office_accounts, year)
+    tasks["business_expenses"] = partial(run_hledger_balances, business_accounts, year)
+    # Mortgage interest may itself be an hledger query
+    tasks["mortgage_interest"] = partial(compute_interest, year, cfg)
+    return tasks
+
+
+def gather_inputs(configs: List[Tuple[int, TaxConfig]]) -> List[Dict[str, float]]:
+    """
+    Run the hledger lookups for every (year, config) pair on one shared thread pool.
+    Returns the inputs for each pair in the same order, keyed by the names from hledger_tasks.
+    """
+    # Hledger queries (unchanged aliases and accounts), resolved once for all years
+    aliases = load_hledger_aliases()
+    resolved_queries = resolve_queries(aliases)
+    tasks = {}
+    for i, (year, cfg) in enumerate(configs):
+        for key, task in hledger_tasks(year, cfg, aliases, resolved_queries).items():
+            tasks[(i, key)] = task
+    with ThreadPoolExecutor(max_workers=HLEDGER_WORKERS) as pool:
+        results = dict(zip(tasks, pool.map(lambda task: task(), tasks.values())))
+    inputs = [{} for _ in configs]
+    for (i, key), value in results.items():
+        inputs[i][key] = value
+    return inputs
+
+
+def compute_from_inputs(year: int, cfg: TaxConfig, inputs: Dict[str, float]):
+    """
+    Compute and print the tax summary for the given year from inputs gathered by gather_inputs.
+    """
+    fed_params = cfg.fed_params
+    ca_params = cfg.ca_params
+    fed_schedule = bracket_schedule(fed_params['brackets'])
+    fed_sd = fed_params['standard_deduction']
+    ss_max = fed_params['ss_max']
+    ca_schedule = bracket_schedule(ca_params['brackets'])
+    ca_sd = ca_params['standard_deduction']
+    ca_surcharges = surcharge_schedule(ca_params.get('surcharges', []))
+    additional_deduction = cfg.additional_deduction
+    home_office = cfg.home_office
+
+    INTEREST = inputs["mortgage_interest"]
+    w2 = inputs["w2"]
+    w2_medicare = inputs["w2_medicare"]
+    w2_ca = inputs["w2_ca"]
+    total_inc = inputs["total_inc"]
+    dividend_longterm = inputs["dividend_longterm"]
+    dividend_shortterm = inputs["dividend_shortterm"]
+    dividend_shortterm_state = inputs["dividend_shortterm_state"]
+    dividend_qualified = inputs["dividend_qualified"]
+    capital_gain_longterm = inputs["capital_gain_longterm"]
+    capital_gain_shortterm = inputs["capital_gain_shortterm"]
+    loss = inputs["loss"]
+    interest = inputs["interest"]
+    interest_state = inputs["interest_state"]
+    fed_tax_paid = inputs["fed_tax_paid"]
+    soc_tax_paid = inputs["soc_tax_paid"]
+    med_tax_paid = inputs["med_tax_paid"]
+    state_tax_paid = inputs["state_tax_paid"]
+    home_office_expenses = sum(inputs["home_office_expenses"])
+    business_expenses = sum(inputs["business_expenses"])
+    foreign_credit = inputs["foreign_credit"]
 
     # Perform calculations using extracted functions
     home_deduct = home_office_expenses * home_office["deduction_rate"]
@@ -301,35 +375,26 @@ def compute_taxes(year: int):
     net_biz = total_inc - w2 - ded - business_expenses
     
     # Calculate taxes using extracted functions
-    solo_cont = compute_solo_401k_contribution(net_biz, year)
+    solo_cont = compute_solo_401k_contribution(net_biz, cfg)
     se_tax = compute_self_employment_tax(net_biz)
     inv_income = interest + dividend_shortterm + dividend_longterm + capital_gain_shortterm + capital_gain_longterm - loss
     
     # Calculate AGI for NIIT threshold check
     agi = w2 + interest + net_biz + (dividend_shortterm + capital_gain_shortterm) - loss - se_tax/2 - solo_cont
-    inv_tax = compute_investment_tax(inv_income, agi, year)
-    ss_extra = compute_social_security_tax(w2_medicare, net_biz, ss_max, soc_tax_paid, year)
-    medicare_extra = compute_medicare_tax(w2_medicare, net_biz, med_tax_paid, year)
+    inv_tax = compute_investment_tax(inv_income, agi, fed_params)
+    ss_extra = compute_social_security_tax(w2_medicare, net_biz, ss_max, soc_tax_paid, cfg)
+    medicare_extra = compute_medicare_tax(w2_medicare, net_biz, med_tax_paid, cfg.medicare_fed_params)
     # Calculate federal taxable income
     fed_taxable_income = (w2 + interest + net_biz + (dividend_shortterm+capital_gain_shortterm) - loss
                    - se_tax/2 - solo_cont - fed_sd - additional_deduction - 0.2*dividend_qualified)
-    tax_liability = compute_bracket_tax(fed_taxable_income, fed_brackets) + 0.2 * (dividend_longterm + capital_gain_longterm)
+    tax_liability = compute_bracket_tax(fed_taxable_income, fed_schedule) + 0.2 * (dividend_longterm + capital_gain_longterm)
     total_tax = tax_liability + inv_tax - ss_extra + se_tax + medicare_extra
     total_tax = max(total_tax, 0.0)
     owed = total_tax - (fed_tax_paid) - foreign_credit
     ca_mod_inc = (w2_ca + interest_state + net_biz +
                   (dividend_shortterm_state + capital_gain_shortterm) - loss - se_tax/2 - solo_cont +
                   dividend_longterm + capital_gain_longterm - ca_sd)
-    # Generalized surcharge logic for CA and FEDERAL
-    def compute_surcharges(taxable_income, surcharges):
-        total = 0.0
-        for s in surcharges or []:
-            threshold = s.get('threshold', 0)
-            rate = s.get('rate', 0)
-            total += rate * max(taxable_income - threshold, 0.0)
-        return total
-    ca_tax = compute_bracket_tax(ca_mod_inc, ca_brackets)
-    ca_owed = compute_surcharges(ca_mod_inc, ca_surcharges) + ca_tax - state_tax_paid
+    ca_owed = compute_schedule_tax(ca_mod_inc, ca_schedule, ca_surcharges) - state_tax_paid
 
     # Output summary
     print("="*64)
@@ -372,12 +437,37 @@ def compute_taxes(year: int):
     print("="*64)
     print("Disclaimer: This assumes standard deduction, etc. Values are computed as per the script logic.")
 
+def compute_taxes(year: int):
+    """
+    Compute and print the tax summary for the given year.
+    """
+    cfg = load_tax_config(year)
+    compute_from_inputs(year, cfg, gather_inputs([(year, cfg)])[0])
+
 def main():
     parser = argparse.ArgumentParser(description="Compute tax summaries for given year(s).")
     parser.add_argument('years', type=int, nargs='+', help='Year(s) to compute taxes for')
+    parser.add_argument('--quick', action='store_true',
+                        help='Reuse cached hledger results if the top-level .journal files are unchanged, without '
+                             're-scanning the journal directory (misses edits to included files in subdirectories)')
     args = parser.parse_args()
+    if args.quick:
+        enable_quick_journal_check()
+    # Load configs in order and stop at the first bad year, so the years before it still print
+    configs = []
+    error = None
     for year in args.years:
-        compute_taxes(year)
+        try:
+            configs.append((year, load_tax_config(year)))
+        except Exception as e:
+            error = e
+            break
+    # Gather every loaded year's hledger inputs together so the queries share one pool
+    inputs = gather_inputs(configs)
+    for (year, cfg), year_inputs in zip(configs, inputs):
+        compute_from_inputs(year, cfg, year_inputs)
+    if error is not None:
+        raise error
 
 if __name__ == "__main__":
     main()
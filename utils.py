@@ -1,39 +1,157 @@
 import os
+import atexit
+import copy
+import csv
+import functools
 import hashlib
+import io
 import pickle
+import re
+import struct
 import subprocess
 import sys
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 import yaml
 import glob
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 CACHE_FILE = "/tmp/hledger_query_cache.pkl"
+PERSONAL_FILE = "hledger_parameters/personal.yaml"
+ALIASES_FILE = "hledger_parameters/aliases.yaml"
+
+_HLEDGER_BAL = ("hledger", "bal")
+_HLEDGER_FORMAT = ("-1", "-O", "csv")
+
+YAML_CACHE_SIZE = 100
+# path -> (mtime, size, parsed contents), kept in LRU order
+_yaml_cache: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+
+def _load_yaml_cached(path: str):
+    """
+    Parse a YAML file, reusing the previous result while the file's mtime and size are unchanged.
+    Returns a deep copy so callers are free to mutate the result.
+    """
+    stat = os.stat(path)
+    cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        _yaml_cache.move_to_end(path)
+        return copy.deepcopy(cached[2])
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        data = yaml.load(text, Loader=_Loader)
+    except yaml.YAMLError:
+        # libyaml rejects some input the pure-Python parser accepts, e.g. the
+        # unquoted `[Income:]` flow sequences in aliases.yaml
+        if _Loader is yaml.SafeLoader:
+            raise
+        data = yaml.load(text, Loader=yaml.SafeLoader)
+    _yaml_cache[path] = (stat.st_mtime, stat.st_size, data)
+    _yaml_cache.move_to_end(path)
+    if len(_yaml_cache) > YAML_CACHE_SIZE:
+        _yaml_cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+def load_personal_params() -> dict:
+    """Load the personal configuration from personal.yaml"""
+    return _load_yaml_cached(PERSONAL_FILE) or {}
 
 def load_journal_directory() -> str:
     """Load the journal directory path from personal.yaml"""
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
-        journal_dir = params.get("journal_directory", "~/cloud/finance")
-        return os.path.expanduser(journal_dir)
+    params = load_personal_params()
+    journal_dir = params.get("journal_directory", "~/cloud/finance")
+    return os.path.expanduser(journal_dir)
 
-JOURNAL_DIR = load_journal_directory()
+@functools.lru_cache(maxsize=1)
+def get_journal_dir() -> str:
+    """Return the journal directory, reading personal.yaml on first use rather than at import."""
+    return load_journal_directory()
+
+def _scan_journal_files(directory: str):
+    """
+    Yield (path, stat) for every file under directory, in a deterministic order.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return  # Missing or unreadable directory, skipped like os.walk does
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            stat = None if is_dir else entry.stat()
+        except OSError:
+            continue  # Deleted mid-walk or unreadable
+        if is_dir:
+            yield from _scan_journal_files(entry.path)
+        else:
+            yield entry.path, stat
 
 def hash_journal_dir(directory: str) -> str:
     """
     Create a hash representing the current state of all files in the journal directory.
     """
-    sha = hashlib.sha256()
-    for root, _, files in os.walk(directory):
-        for f in sorted(files):
-            path = os.path.join(root, f)
-            try:
-                stat = os.stat(path)
-                sha.update(path.encode())
-                sha.update(str(stat.st_mtime).encode())
-                sha.update(str(stat.st_size).encode())
-            except FileNotFoundError:
-                continue  # In case file is deleted mid-walk
-    return sha.hexdigest()
+    digest = hashlib.blake2b(digest_size=16)
+    for path, stat in _scan_journal_files(directory):
+        digest.update(struct.pack("<dQ", stat.st_mtime, stat.st_size) + path.encode())
+    return digest.hexdigest()
+
+def _quick_journal_stamp(directory: str) -> Optional[tuple]:
+    """
+    Cheap fingerprint of the top-level .journal files: their names, mtimes and sizes from a single scandir.
+    Returns None if there are no top-level journal files to go on.
+    """
+    try:
+        with os.scandir(directory) as it:
+            stamp = tuple(sorted((e.name, e.stat().st_mtime, e.stat().st_size)
+                                 for e in it if e.name.endswith(".journal") and e.is_file()))
+    except OSError:
+        return None
+    return stamp or None
+
+# Cache entry recording (quick stamp, journal hash) for the last full hash
+_QUICK_STAMP_KEY = "__quick_stamp__"
+_journal_hash_cache: Optional[str] = None
+_quick_journal_check = False
+
+def enable_quick_journal_check():
+    """
+    Trust an unchanged set of top-level .journal files instead of re-hashing the whole journal directory.
+    Off by default: edits confined to included files in subdirectories are not detected in this mode.
+    """
+    global _quick_journal_check
+    _quick_journal_check = True
+
+def _get_journal_hash() -> str:
+    """
+    Return the journal directory hash, computing it at most once per process.
+    With enable_quick_journal_check(), if the top-level .journal files are unchanged since the hash
+    was last computed, the previous hash is reused without walking the directory. Callers must hold _cache_lock.
+    """
+    global _journal_hash_cache, _cache_dirty
+    if _journal_hash_cache is not None:
+        return _journal_hash_cache
+    directory = get_journal_dir()
+    cache = _get_cache()
+    stamp = _quick_journal_stamp(directory)
+    saved = cache.get(_QUICK_STAMP_KEY)
+    if (_quick_journal_check and stamp is not None and saved is not None
+            and saved[0] == stamp and saved[1] in cache):
+        _journal_hash_cache = saved[1]
+    else:
+        _journal_hash_cache = hash_journal_dir(directory)
+        # Always record the stamp so a later quick run can reuse this hash
+        if saved != (stamp, _journal_hash_cache):
+            cache[_QUICK_STAMP_KEY] = (stamp, _journal_hash_cache)
+            _cache_dirty = True
+    return _journal_hash_cache
 
 def load_cache() -> Dict:
     if os.path.exists(CACHE_FILE):
@@ -45,91 +163,212 @@ def load_cache() -> Dict:
     return {}
 
 def save_cache(cache: Dict):
+    tmp_file = f"{CACHE_FILE}.{os.getpid()}.tmp"
     try:
-        with open(CACHE_FILE, "wb") as f:
+        with open(tmp_file, "wb") as f:
             pickle.dump(cache, f)
+        os.replace(tmp_file, CACHE_FILE)  # Never leave a half-written cache behind
     except Exception:
-        pass 
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
+
+_cache_mem: Optional[Dict] = None
+_cache_dirty = False
+# Guards the journal hash and query cache, which run_hledger_command may touch from several threads
+_cache_lock = threading.Lock()
+
+def _flush_cache():
+    """
+    Write the query cache to disk if any query missed this run.
+    Only entries for the current journal state are kept; results for older states can never hit again.
+    """
+    with _cache_lock:
+        if not _cache_dirty:
+            return
+        cache = {_journal_hash_cache: _cache_mem.get(_journal_hash_cache, {})}
+        if _QUICK_STAMP_KEY in _cache_mem:
+            cache[_QUICK_STAMP_KEY] = _cache_mem[_QUICK_STAMP_KEY]
+        save_cache(cache)
+
+def _get_cache() -> Dict:
+    """
+    Return the in-memory query cache, loading it from disk on first use.
+    The cache is written back once at interpreter exit. Callers must hold _cache_lock.
+    """
+    global _cache_mem
+    if _cache_mem is None:
+        _cache_mem = load_cache()
+        atexit.register(_flush_cache)
+    return _cache_mem
+
+# Removes currency symbols and thousands separators from hledger amounts
+_STRIP = str.maketrans('', '', '$,')
 
 def parse_hledger_output(output: str) -> float:
     """
     Parse the output of an hledger command and extract the numeric total from the last line.
+    Handles both `-O csv` output, where the last row is the total, and the default text layout.
     """
-    if not output.strip():
+    output = output.rstrip()
+    if not output:
         return 0.0
-    last_line = output.strip().splitlines()[-1]  # Get the last line of output
-    total_str = last_line.split()[0].replace('$', '').replace(',', '')
+    last_line = output.rpartition('\n')[2]  # Get the last line of output
+    if last_line.startswith('"'):
+        # hledger quotes every CSV field; the balance is the last column
+        total_str = next(csv.reader([last_line]))[-1].translate(_STRIP)
+    else:
+        total_str = last_line.split(None, 1)[0].translate(_STRIP)
     try:
         return abs(float(total_str))
     except ValueError:
         return 0.0
 
-def run_hledger_command(args: list, year: Optional[int] = None, add_format: bool = True) -> float:
+def _run_cached(cache_key, build_cmd, parse, default):
     """
-    Run hledger bal and return the parsed result. Appends default format args unless add_format is False.
+    Return the cached result for cache_key under the current journal state, or run build_cmd(),
+    parse its stdout with parse, and cache the result.
+    The command is only built on a cache miss. Returns default without caching if the command fails.
     """
-    cmd = ["hledger", "bal"]
-    if year is not None:
-        cmd += ["-p", str(year)]
-    cmd += args
-    if add_format:
-        cmd += ["-1"]
-
-    cache_key = (tuple(args), year)
-    journal_hash = hash_journal_dir(JOURNAL_DIR)
-
-    cache = load_cache()
-    if journal_hash in cache and cache_key in cache[journal_hash]:
-        return cache[journal_hash][cache_key]
+    with _cache_lock:
+        journal_hash = _get_journal_hash()
+        cache = _get_cache()
+        entries = cache.get(journal_hash)
+        if entries is not None and cache_key in entries:
+            return entries[cache_key]
 
+    cmd = build_cmd()
     try:
         proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
     except subprocess.CalledProcessError as e:
         print(f"Error running {' '.join(cmd)}: {e}", file=sys.stderr)
-        return 0.0
-    result = parse_hledger_output(proc.stdout)
-    if journal_hash not in cache:
-        cache[journal_hash] = {}
-    cache[journal_hash][cache_key] = result
-    save_cache(cache)
-    return result 
-
-def load_tax_params(year: int) -> dict:
+        return default
+    result = parse(proc.stdout)
+    global _cache_dirty
+    with _cache_lock:
+        _cache_dirty = True
+        if journal_hash not in cache:
+            cache[journal_hash] = {}
+        cache[journal_hash][cache_key] = result
+    return result
+
+def run_hledger_command(args: list, year: Optional[int] = None, add_format: bool = True) -> float:
+    """
+    Run hledger bal and return the parsed result. Appends default format args unless add_format is False.
+    """
+    args_t = tuple(args)
+    def build_cmd():
+        period = ("-p", str(year)) if year is not None else ()
+        return _HLEDGER_BAL + period + args_t + (_HLEDGER_FORMAT if add_format else ())
+    return _run_cached((args_t, year), build_cmd, parse_hledger_output, 0.0)
+
+# hledger query prefixes other than plain account regexes, e.g. not:, desc:, amt:
+_QUERY_PREFIXES = ("acct:", "amt:", "code:", "cur:", "date:", "date2:", "depth:", "desc:", "expr:",
+                   "inacct:", "not:", "note:", "payee:", "real:", "status:", "tag:")
+
+def _is_plain_account_query(acct: str) -> bool:
+    """
+    True if acct is a bare account regex that parse_hledger_balances can match itself.
+    """
+    if acct.startswith("-") or any(c.isspace() for c in acct) or acct.lower().startswith(_QUERY_PREFIXES):
+        return False
+    try:
+        re.compile(acct)
+    except re.error:
+        return False
+    return True
+
+def parse_hledger_balances(output: str, accounts: List[str]) -> Optional[List[float]]:
+    """
+    Parse flat `hledger bal -O csv` output and total the rows matched by each account query.
+    Only plain account regexes are supported (see _is_plain_account_query): they are matched against
+    the row names with Python's re, case-insensitively like hledger, so a row counts towards every query it matches.
+    Returns the absolute totals aligned with accounts, or None if a row's amount cannot be parsed
+    (e.g. a multi-commodity balance), in which case the caller should query each account separately.
+    """
+    patterns = [re.compile(acct, re.IGNORECASE) for acct in accounts]
+    totals = [0.0] * len(accounts)
+    rows = csv.reader(io.StringIO(output))
+    next(rows, None)  # Skip the "account","balance" header
+    for row in rows:
+        if len(row) < 2:
+            continue
+        try:
+            amount = float(row[1].translate(_STRIP))
+        except ValueError:
+            print(f"Warning: could not parse hledger balance row {row!r}; querying accounts one at a time", file=sys.stderr)
+            return None
+        for i, pattern in enumerate(patterns):
+            if pattern.search(row[0]):
+                totals[i] += amount
+    return [abs(total) for total in totals]
+
+def run_hledger_balances(accounts: List[str], year: int) -> List[float]:
+    """
+    Return the balance of each account query for the given year, aligned with accounts.
+    Plain account regexes are fetched with a single hledger bal invocation. Anything else (query terms
+    such as not: or desc:, options, patterns Python's re rejects), or output that cannot be parsed,
+    falls back to run_hledger_command([acct], year=year) per account.
+    """
+    if not accounts:
+        return []
+    plain = tuple(acct for acct in accounts if _is_plain_account_query(acct))
+    totals = {}
+    if plain:
+        def build_cmd():
+            return _HLEDGER_BAL + ("-p", str(year)) + plain + ("-O", "csv", "--flat", "--no-total")
+        cache_key = ("balances", plain, year)
+        batched = _run_cached(cache_key, build_cmd, lambda out: parse_hledger_balances(out, list(plain)), None)
+        if batched is not None:
+            totals = dict(zip(plain, batched))
+    return [totals[acct] if acct in totals else run_hledger_command([acct], year=year) for acct in accounts]
+
+@functools.lru_cache(maxsize=32)
+def load_tax_params(year: int, filing_status: str = "joint") -> dict:
+    """
+    Load federal and CA tax parameters for the year, falling back to the latest available year.
+    'federal' and 'ca' are resolved for filing_status, falling back to 'joint'; 'raw' holds the full files.
+    The result is cached and shared between callers, so it must not be mutated.
+    """
     def load_jurisdiction(jurisdiction: str, year: int):
         folder = f"tax_parameters/{jurisdiction.upper()}"
         year_file = f"{folder}/{year}.yaml"
         if os.path.exists(year_file):
-            with open(year_file, "r") as f:
-                return yaml.safe_load(f)
+            return _load_yaml_cached(year_file)
         # Use the latest year available
         year_files = glob.glob(f"{folder}/*.yaml")
         years = [int(os.path.splitext(os.path.basename(f))[0]) for f in year_files if os.path.basename(f)[:-5].isdigit()]
         if not years:
             raise FileNotFoundError(f"No tax parameter file found for {jurisdiction}")
         latest_year = max(years)
-        with open(f"{folder}/{latest_year}.yaml", "r") as f:
-            return yaml.safe_load(f)
+        return _load_yaml_cached(f"{folder}/{latest_year}.yaml")
+    def resolve_status(params: dict, name: str):
+        status_params = params.get(filing_status)
+        if status_params is None:
+            status_params = params.get('joint')
+        if status_params is None:
+            raise ValueError(f"No {name} tax parameters found for filing status '{filing_status}' or 'joint'.")
+        return status_params
     federal = load_jurisdiction("federal", year)
     ca = load_jurisdiction("ca", year)
-    return {"federal": federal, "ca": ca}
+    return {
+        "federal": resolve_status(federal, "federal"),
+        "ca": resolve_status(ca, "CA"),
+        "raw": {"federal": federal, "ca": ca},
+    }
 
 def load_hledger_aliases() -> dict:
-    with open("hledger_parameters/aliases.yaml", "r") as f:
-        return yaml.safe_load(f)
+    return _load_yaml_cached(ALIASES_FILE)
 
 def load_business_expenses() -> list:
-    with open("hledger_parameters/business_income.yaml", "r") as f:
-        return yaml.safe_load(f).get("business_expenses", [])
+    return _load_yaml_cached("hledger_parameters/business_income.yaml").get("business_expenses", [])
 
 def load_home_office_info() -> dict:
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        params = yaml.safe_load(f)
-        return params.get("home_office", {})
+    return load_personal_params().get("home_office", {})
 
 def load_filing_status() -> str:
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        return yaml.safe_load(f).get("filing_status", "joint")
+    return load_personal_params().get("filing_status", "joint")
 
 def load_additional_federal_deduction() -> float:
-    with open("hledger_parameters/personal.yaml", "r") as f:
-        return yaml.safe_load(f).get("additional_federal_deduction", 0.0) 
\ No newline at end of file
+    return load_personal_params().get("additional_federal_deduction", 0.0)